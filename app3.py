@@ -1,45 +1,159 @@
 import streamlit as st
 import pandas as pd
-import io
+import numpy as np
 import os
+import contextlib
+import tempfile
 from google.oauth2 import service_account
 
 # --- Import Handling ---
 try:
-    import matplotlib.pyplot as plt
+    import altair as alt
+    import pyarrow as pa
     from google.cloud import storage
+    from google.cloud.storage import transfer_manager
 except ImportError as e:
     st.error(f"Critical dependency error: {str(e)}")
     st.stop()  # Halt if imports fail
 
+# Numba is optional: it only speeds up the rolling mean
+try:
+    import numba  # noqa: F401
+    ROLLING_ENGINE = {
+        "engine": "numba",
+        "engine_kwargs": {"nopython": True, "nogil": True},
+    }
+except ImportError:
+    ROLLING_ENGINE = {}
+
 # --- App Configuration ---
 st.set_page_config(page_title="🌦️ Weather Data Dashboard", layout="wide")
 st.title("🌤️ Smart Weather Data Dashboard")
 
 # --- GCP Bucket Settings ---
 BUCKET_NAME = "weather-data-nimish"
-BLOB_NAME = "weather_backup.csv"
-
-@st.cache_data(show_spinner=True)
-def load_gcs_csv(bucket_name, blob_name):
-    """Load CSV from GCS with explicit authentication"""
-    try:
-        # Use Streamlit secrets for authentication
-        credentials = service_account.Credentials.from_service_account_info(
-            st.secrets["gcp"]
+BLOB_NAME = "weather_backup.parquet"
+CHUNK_SIZE = 32 * 1024 * 1024  # Byte range fetched per worker for large blobs
+DOWNLOAD_DIR = os.path.join(tempfile.gettempdir(), "weather-dashboard")
+MAX_PLOT_POINTS = 500  # Points drawn per series in the dual-axis chart
+
+# --- Weather Schema ---
+WEATHER_DTYPES = {
+    "temperature_2m": "float32",
+    "soil_temperature_0_to_7cm": "float32",
+    "soil_moisture_0_to_7cm": "float32",
+    "dew_point_2m": "float32",
+    "relative_humidity_2m": "float32",
+}
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def download_blob_chunked(_blob, bucket_name, blob_name, generation):
+    """Download a large blob as parallel byte ranges and return the local path"""
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    path = os.path.join(DOWNLOAD_DIR, f"{generation}-{blob_name}")
+    if not os.path.exists(path):
+        # Write to a temporary name so a failed download is never reused
+        part_path = path + ".part"
+        transfer_manager.download_chunks_concurrently(
+            _blob,
+            part_path,
+            chunk_size=CHUNK_SIZE,
+            max_workers=8,
+            worker_type=transfer_manager.THREAD
         )
-        client = storage.Client(
-            project=st.secrets["gcp"]["project_id"],
-            credentials=credentials
-        )
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(blob_name)
-        data = blob.download_as_bytes()
-        return pd.read_csv(io.BytesIO(data))
+        os.replace(part_path, path)
+    # Only the current generation is ever read again; drop older copies
+    for name in os.listdir(DOWNLOAD_DIR):
+        name_generation, _, name_blob = name.partition("-")
+        if name_generation != str(generation) and name_blob.removesuffix(".part") == blob_name:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(DOWNLOAD_DIR, name))
+    return path
+
+@st.cache_data(persist="disk", show_spinner=True, max_entries=1)
+def read_gcs_parquet(_blob, bucket_name, blob_name, etag):
+    """Read a Parquet blob; cached on disk per etag so unchanged data skips GCS"""
+    if _blob.size > CHUNK_SIZE:
+        path = download_blob_chunked(_blob, bucket_name, blob_name, _blob.generation)
+        return pd.read_parquet(path, engine="pyarrow")
+    # Stream the blob straight into the reader instead of buffering it all
+    with _blob.open("rb") as f:
+        return pd.read_parquet(f, engine="pyarrow")
+
+@st.cache_resource(show_spinner=False)
+def get_gcs_client():
+    """Build the authenticated GCS client once per server process"""
+    # Use Streamlit secrets for authentication
+    credentials = service_account.Credentials.from_service_account_info(
+        st.secrets["gcp"]
+    )
+    return storage.Client(
+        project=st.secrets["gcp"]["project_id"],
+        credentials=credentials
+    )
+
+def load_gcs_parquet(bucket_name, blob_name):
+    """Load Parquet from GCS with explicit authentication"""
+    try:
+        blob = get_gcs_client().bucket(bucket_name).blob(blob_name)
+        blob.reload()  # Metadata only: size, generation and etag
+        return read_gcs_parquet(blob, bucket_name, blob_name, blob.etag)
     except Exception as e:
         st.error(f"GCS Error: {str(e)}")
         return None
 
+def read_weather_csv(source):
+    """Read a weather CSV with dates and numeric dtypes decoded by the C parser"""
+    columns = pd.read_csv(source, nrows=0).columns
+    source.seek(0)
+    return pd.read_csv(
+        source,
+        parse_dates=["time"] if "time" in columns else False,
+        date_format="ISO8601",
+        dtype=WEATHER_DTYPES
+    )
+
+@st.cache_data(show_spinner=False)
+def preprocess(df_raw):
+    """Parse, sort and derive columns once instead of on every rerun
+
+    Returns the time-indexed frame plus the small preview tables shown in the UI.
+    """
+    df = df_raw.copy()
+    if not pd.api.types.is_datetime64_any_dtype(df["time"]):
+        df["time"] = pd.to_datetime(df["time"])
+    df = df.set_index("time").sort_index()
+    rolling = df["temperature_2m"].rolling(window=24, min_periods=1).mean(**ROLLING_ENGINE)
+    # Arrow-backed columns are already in the format Streamlit sends to the browser
+    arrow_float = pd.ArrowDtype(pa.float32())
+    df = df.astype({c: arrow_float for c in WEATHER_DTYPES if c in df.columns})
+    head = df.head().reset_index()
+    df["temp_rolling_24h"] = rolling.astype(arrow_float)
+    tail = df.tail(20).reset_index()
+    return df, head, tail
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def dual_axis_chart(_df, fingerprint):
+    """Altair chart of temperature and soil moisture on independent y-axes"""
+    # Stride-decimate so the browser draws a few hundred points, not one per hour
+    step = max(1, len(_df) // MAX_PLOT_POINTS)
+    source = _df.iloc[::step][["temperature_2m", "soil_moisture_0_to_7cm"]].reset_index()
+    base = alt.Chart(source).encode(x=alt.X("time:T", title="Time"))
+    temperature = base.mark_line(color="#1f77b4", point=True).encode(
+        y=alt.Y("temperature_2m:Q", title="Temperature (C)", axis=alt.Axis(titleColor="#1f77b4"))
+    )
+    soil_moisture = base.mark_line(
+        color="#ff7f0e", point=alt.OverlayMarkDef(shape="square", color="#ff7f0e")
+    ).encode(
+        y=alt.Y(
+            "soil_moisture_0_to_7cm:Q",
+            title="Soil Moisture",
+            axis=alt.Axis(orient="right", titleColor="#ff7f0e")
+        )
+    )
+    chart = alt.layer(temperature, soil_moisture).resolve_scale(y="independent")
+    return chart.properties(title="Temperature & Soil Moisture Over Time")
+
 # --- Data Loading UI ---
 st.sidebar.header("Load Data")
 use_gcs = st.sidebar.checkbox("Load from Google Cloud Storage", value=True)
@@ -50,13 +164,13 @@ if "df" not in st.session_state:
 if use_gcs:
     if st.sidebar.button("Load latest from GCS"):
         with st.spinner("Loading from GCS..."):
-            st.session_state.df = load_gcs_csv(BUCKET_NAME, BLOB_NAME)
+            st.session_state.df = load_gcs_parquet(BUCKET_NAME, BLOB_NAME)
             if st.session_state.df is not None:
                 st.success("✅ Data loaded from GCS!")
 else:
     uploaded_file = st.file_uploader("Upload your weather CSV", type=["csv"])
     if uploaded_file is not None:
-        st.session_state.df = pd.read_csv(uploaded_file)
+        st.session_state.df = read_weather_csv(uploaded_file)
         st.success("✅ Data loaded from local upload!")
 
 df = st.session_state.df
@@ -64,20 +178,17 @@ df = st.session_state.df
 # --- Dashboard ---
 if df is not None:
     st.subheader("Raw Weather Data")
-    st.dataframe(df.head(), use_container_width=True)
-
     if "time" in df.columns:
-        df["time"] = pd.to_datetime(df["time"])
-        df = df.sort_values("time")
+        df, head, tail = preprocess(df)
+        st.dataframe(head, use_container_width=True)
 
-        df_kpi = df.dropna(subset=["temperature_2m", "soil_moisture_0_to_7cm"])
-        if len(df_kpi) == 0:
+        complete = df["temperature_2m"].notna().to_numpy() & df["soil_moisture_0_to_7cm"].notna().to_numpy()
+        complete_idx = np.flatnonzero(complete)
+        if complete_idx.size == 0:
             st.warning("No complete row found for KPIs! Check your data for missing values.")
             latest = df.iloc[-1]
         else:
-            latest = df_kpi.iloc[-1]
-
-        df["temp_rolling_24h"] = df["temperature_2m"].rolling(window=24, min_periods=1).mean()
+            latest = df.iloc[complete_idx[-1]]
 
         kpi1, kpi2, kpi3 = st.columns(3)
         kpi1.metric(label="🌡️ Latest Temperature", value=f"{latest['temperature_2m']:.1f} °C")
@@ -85,10 +196,10 @@ if df is not None:
         kpi3.metric(label="📆 Records Ingested", value=f"{len(df)}")
 
         st.subheader("Temperature Trend (with 24h rolling avg)")
-        st.line_chart(df.set_index("time")[["temperature_2m", "temp_rolling_24h"]])
+        st.line_chart(df[["temperature_2m", "temp_rolling_24h"]])
 
         st.subheader("Soil Moisture Trend")
-        st.area_chart(df.set_index("time")["soil_moisture_0_to_7cm"])
+        st.area_chart(df["soil_moisture_0_to_7cm"])
 
         col1, col2 = st.columns([2, 1])
         with col1:
@@ -105,27 +216,22 @@ if df is not None:
                 index=0,
                 key="metric_select"
             )
-            st.line_chart(df.set_index("time")[metric_option])
+            st.line_chart(df[metric_option])
 
         with col2:
             st.subheader("Latest Row Details")
             st.dataframe(latest.to_frame(), use_container_width=True)
 
         st.markdown("### Recent Weather Events Table")
-        st.dataframe(df.tail(20), use_container_width=True)
+        st.dataframe(tail, use_container_width=True)
 
         st.markdown("#### 📉 Temperature & Soil Moisture (Dual Axis)")
-        fig, ax1 = plt.subplots()
-        ax2 = ax1.twinx()
-        ax1.plot(df["time"], df["temperature_2m"], color='tab:blue', marker='o', label="Temperature (C)")
-        ax2.plot(df["time"], df["soil_moisture_0_to_7cm"], color='tab:orange', marker='s', label="Soil Moisture")
-        ax1.set_xlabel("Time")
-        ax1.set_ylabel("Temperature (C)", color='tab:blue')
-        ax2.set_ylabel("Soil Moisture", color='tab:orange')
-        plt.title("Temperature & Soil Moisture Over Time")
-        fig.tight_layout()
-        st.pyplot(fig)
+        st.altair_chart(
+            # Key on the data itself: the resource cache is shared across sessions
+            dual_axis_chart(df, pd.util.hash_pandas_object(df).sum()), use_container_width=True
+        )
     else:
+        st.dataframe(df.head(), use_container_width=True)
         st.warning("No 'time' column found! Please upload a valid weather CSV or check your GCS file.")
 else:
     st.info("⬆️ Please upload or load weather data to see tables and visualizations.")
@@ -1,10 +1,20 @@
 import requests
 import pandas as pd
+import numpy as np
 import os
+import io
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "/Users/nimishmathur/Desktop/WIKIPEDIA-PIPELINE/Streamlit.json"
 from google.cloud import storage
 from google.cloud import pubsub_v1
+from google.cloud.pubsub_v1.types import BatchSettings
 import datetime
+import asyncio
+
+# orjson is optional: a faster drop-in for parsing the API response
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 # --- Parameters ---
 latitude = 49.4875   # Mannheim, Germany
@@ -23,6 +33,7 @@ variables = [
 ]
 BUCKET_NAME = 'weather-data-nimish'
 CSV_FILENAME = "weather_backup.csv"
+PARQUET_FILENAME = "weather_backup.parquet"
 PUBSUB_PROJECT_ID = "wikipedia-462519"
 PUBSUB_TOPIC_ID = "weather-demo-topic"
 
@@ -34,33 +45,66 @@ url = (
     f"&hourly={','.join(variables)}"
     "&timezone=Europe/Berlin"
 )
-response = requests.get(url)
-data = response.json()["hourly"]
-df = pd.DataFrame(data)
+response = requests.get(url, timeout=30)
+response.raise_for_status()
+data = json_loads(response.content)["hourly"]
 
-# --- REMOVE EMPTY ROWS ---
-df = df.dropna(
-    subset=["temperature_2m", "soil_temperature_0_to_7cm", "soil_moisture_0_to_7cm", "dew_point_2m", "relative_humidity_2m"],
-    how='all'
+# --- BUILD FLOAT32 COLUMNS, DROPPING ROWS WHERE EVERY VARIABLE IS EMPTY ---
+# JSON nulls become NaN; one mask filters all columns without an interim frame
+arrays = {v: np.asarray(data[v], dtype=np.float32) for v in variables}
+keep = np.flatnonzero(np.any([~np.isnan(a) for a in arrays.values()], axis=0))
+df = pd.DataFrame(
+    {"time": np.asarray(data["time"])[keep], **{v: a[keep] for v, a in arrays.items()}},
+    index=keep
 )
 
-df.to_csv(CSV_FILENAME, index=False)
-print(f"Data saved to {CSV_FILENAME}")
+# --- SERIALIZE IN MEMORY, NO LOCAL FILE ROUND-TRIP ---
+csv_buffer = io.BytesIO()
+df.to_csv(csv_buffer, index=False)
+# Store time as a real timestamp so readers skip string parsing
+parquet_buffer = io.BytesIO()
+df.assign(time=pd.to_datetime(df["time"], format="ISO8601")).to_parquet(
+    parquet_buffer, index=False, compression="zstd"
+)
 
 # --- 2. Upload to GCS ---
-client = storage.Client()
-bucket = client.bucket(BUCKET_NAME)
-blob = bucket.blob(CSV_FILENAME)
-blob.upload_from_filename(CSV_FILENAME)
-print(f"File {CSV_FILENAME} uploaded to gs://{BUCKET_NAME}/{CSV_FILENAME}")
+def upload_buffer(bucket, filename, buffer, content_type):
+    buffer.seek(0)
+    blob = bucket.blob(filename)
+    blob.upload_from_file(buffer, content_type=content_type)
+    print(f"File {filename} uploaded to gs://{BUCKET_NAME}/{filename}")
+
+async def upload_to_gcs():
+    client = storage.Client()
+    bucket = client.bucket(BUCKET_NAME)
+    await asyncio.gather(
+        asyncio.to_thread(upload_buffer, bucket, CSV_FILENAME, csv_buffer, "text/csv"),
+        asyncio.to_thread(
+            upload_buffer, bucket, PARQUET_FILENAME, parquet_buffer, "application/vnd.apache.parquet"
+        ),
+    )
 
 # --- 3. Publish to Pub/Sub ---
-try:
-    publisher = pubsub_v1.PublisherClient()
-    topic_path = publisher.topic_path(PUBSUB_PROJECT_ID, PUBSUB_TOPIC_ID)
-    for i, row in df.head(24).iterrows():
-        msg = f"Weather event {i}: Temp {row['temperature_2m']}C"
-        publisher.publish(topic_path, msg.encode("utf-8"))
-        print(f"Published: {msg}")
-except Exception as e:
-    print("Skipping Pub/Sub publish. Error:", e)
+def publish_events():
+    try:
+        # Coalesce the messages into as few publish RPCs as possible
+        publisher = pubsub_v1.PublisherClient(
+            batch_settings=BatchSettings(max_messages=100, max_latency=0.1)
+        )
+        topic_path = publisher.topic_path(PUBSUB_PROJECT_ID, PUBSUB_TOPIC_ID)
+        messages = [
+            f"Weather event {row.Index}: Temp {row.temperature_2m:.1f}C"
+            for row in df.head(24).itertuples()
+        ]
+        publish_futures = [publisher.publish(topic_path, msg.encode("utf-8")) for msg in messages]
+        for msg, publish_future in zip(messages, publish_futures):
+            publish_future.result()
+            print(f"Published: {msg}")
+    except Exception as e:
+        print("Skipping Pub/Sub publish. Error:", e)
+
+# --- Uploads and publishing are independent I/O, so overlap them ---
+async def main():
+    await asyncio.gather(upload_to_gcs(), asyncio.to_thread(publish_events))
+
+asyncio.run(main())